@@ -5,63 +5,252 @@ Basic ML training script demonstrating MLOps workflow.
 
 import os
 import sys
-import json
-import pickle
 import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Tuple, Dict, Any
+from functools import lru_cache
+from typing import Tuple, Dict, Any, List, Optional
 
 import numpy as np
+import orjson
+import skops.io as sio
+import sklearn
 from sklearn.datasets import make_classification
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import accuracy_score, classification_report
+from sklearn.ensemble import HistGradientBoostingClassifier
 from sklearn.preprocessing import StandardScaler
 
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Types outside skops' defaults that the saved model needs to load
+TRUSTED_MODEL_TYPES = [
+    "sklearn.ensemble._hist_gradient_boosting.predictor.TreePredictor",
+]
 
-def create_synthetic_data(n_samples: int = 1000, n_features: int = 20) -> Tuple[np.ndarray, np.ndarray]:
-    """Create synthetic dataset for demonstration purposes."""
-    logger.info(f"Creating synthetic dataset with {n_samples} samples and {n_features} features")
+# Bump when the cached synthetic arrays change format (e.g. dtype casts)
+SYNTH_CACHE_VERSION = 2
+
+# Below this many rows, NumPy beats numba's import/compile and thread startup
+PARALLEL_MIN_ROWS = 100_000
+
+# Mini-batches used to accumulate the scaler's mean/var with partial_fit
+SCALER_FIT_BATCHES = 8
+
+
+def create_synthetic_data(n_samples: int = 1000, n_features: int = 20,
+                          data_dir: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Create synthetic dataset for demonstration purposes.
     
-    X, y = make_classification(
+    The arrays are cached as .npz in ``data_dir`` (the repo's data/ by default).
+    """
+    params = dict(
         n_samples=n_samples,
         n_features=n_features,
         n_informative=15,
         n_redundant=5,
         random_state=42
     )
+    # Key the cache on every generator parameter and the sklearn version
+    # (make_classification's output may change between releases) so a stale
+    # file is never reused
+    cache_key = "_".join(f"{k}{v}" for k, v in params.items())
+    if data_dir is None:
+        data_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
+    cache_path = os.path.join(
+        data_dir, f"synth_v{SYNTH_CACHE_VERSION}_sklearn{sklearn.__version__}_{cache_key}.npz"
+    )
+    
+    if os.path.exists(cache_path):
+        logger.info(f"Loading cached synthetic dataset from {cache_path}")
+        with np.load(cache_path) as cached:
+            return cached["X"], cached["y"]
+    
+    logger.info(f"Creating synthetic dataset with {n_samples} samples and {n_features} features")
+    
+    X, y = make_classification(**params)
+    # X stays float64: HistGradientBoosting validates to float64, so a float32
+    # X would only be copied back inside fit/predict. Labels fit in int32.
+    y = y.astype(np.int32, copy=False)
+    
+    # Write to a temp file and rename so an interrupted run never leaves a
+    # truncated cache behind
+    os.makedirs(data_dir, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=data_dir, suffix=".npz", delete=False) as tmp:
+        try:
+            np.savez(tmp, X=X, y=y)
+        except BaseException:
+            os.unlink(tmp.name)
+            raise
+    # NamedTemporaryFile creates the file 0600; give the cache normal permissions
+    umask = os.umask(0)
+    os.umask(umask)
+    os.chmod(tmp.name, 0o666 & ~umask)
+    os.replace(tmp.name, cache_path)
+    
     return X, y
 
 
+def stratified_split_indices(y: np.ndarray, test_size: float = 0.2,
+                             random_state: int = 42) -> Tuple[np.ndarray, np.ndarray]:
+    """Return shuffled, stratified train/test row indices.
+    
+    Rows are grouped by class with one permutation and one stable argsort
+    (O(N log N)) instead of a per-class scan over y. Like train_test_split,
+    every class needs at least two rows.
+    """
+    # intp labels index offsets/n_test directly without per-call casts
+    y_ind = np.asarray(y, dtype=np.intp)
+    class_counts = np.bincount(y_ind)
+    if class_counts[class_counts > 0].min() < 2:
+        raise ValueError("Every class needs at least 2 rows for a stratified split")
+    rng = np.random.default_rng(random_state)
+    
+    # Shuffle once, then stable-sort by class so each class block stays shuffled
+    perm = rng.permutation(len(y_ind))
+    order = perm[np.argsort(y_ind[perm], kind='stable')]
+    
+    offsets = np.r_[0, np.cumsum(class_counts)]
+    
+    # Like train_test_split: ceil(test_size * n) test rows in total, floored per
+    # class and topped up by largest remainder so class ratios are preserved
+    exact = test_size * class_counts
+    n_test = np.floor(exact).astype(np.intp)
+    shortfall = int(np.ceil(test_size * len(y_ind))) - int(n_test.sum())
+    n_test[np.argsort(n_test - exact, kind='stable')[:shortfall]] += 1
+    
+    # Position of each row within its class block decides train vs test
+    sorted_y = y_ind[order]
+    rank = np.arange(len(order)) - offsets[sorted_y]
+    test_mask = np.zeros(len(y_ind), dtype=bool)
+    test_mask[order[rank < n_test[sorted_y]]] = True
+    
+    # Read the masks back in shuffled order so classes are interleaved
+    in_test = test_mask[perm]
+    return perm[~in_test], perm[in_test]
+
+
+@lru_cache(maxsize=None)
+def _apply_scale_kernel():
+    """Import numba and build the fused scaling kernel on first use."""
+    from numba import njit, prange
+    
+    @njit(parallel=True, fastmath=True, cache=True)
+    def apply_scale(X, mean, inv_scale):
+        for i in prange(X.shape[0]):
+            for j in range(X.shape[1]):
+                X[i, j] = (X[i, j] - mean[j]) * inv_scale[j]
+    
+    return apply_scale
+
+
+def scale_in_place(scaler: StandardScaler, X: np.ndarray) -> np.ndarray:
+    """Standardize X with a fitted scaler, overwriting X when it is floating point.
+    
+    Unlike ``scaler.transform``, floating-point input is modified in place and
+    returned. Integer input is first upcast to a new float array so the scaled
+    values are not truncated. Inputs of PARALLEL_MIN_ROWS rows or more use a
+    fused numba kernel parallel over rows; smaller ones use NumPy.
+    """
+    X = np.asarray(X, dtype=np.result_type(X.dtype, np.float32))
+    if X.shape[0] < PARALLEL_MIN_ROWS:
+        np.subtract(X, scaler.mean_, out=X)
+        np.divide(X, scaler.scale_, out=X)
+        return X
+    
+    _apply_scale_kernel()(X, scaler.mean_, 1.0 / scaler.scale_)
+    return X
+
+
 def preprocess_data(X: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, StandardScaler]:
     """Split and preprocess the data."""
     logger.info("Splitting data into train/test sets")
     
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, stratify=y
-    )
+    train_idx, test_idx = stratified_split_indices(y, test_size=0.2, random_state=42)
+    X_train, X_test = X[train_idx], X[test_idx]
+    y_train, y_test = y[train_idx], y[test_idx]
     
     logger.info("Scaling features")
     scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
+    # Accumulate mean/var over mini-batches, then scale the rows in place
+    # Never more batches than rows: partial_fit rejects empty batches
+    n_batches = max(1, min(SCALER_FIT_BATCHES, len(X_train)))
+    for batch in np.array_split(X_train, n_batches):
+        scaler.partial_fit(batch)
+    X_train_scaled = scale_in_place(scaler, X_train)
+    X_test_scaled = scale_in_place(scaler, X_test)
     
     return X_train_scaled, X_test_scaled, y_train, y_test, scaler
 
 
-def train_model(X_train: np.ndarray, y_train: np.ndarray) -> RandomForestClassifier:
-    """Train a Random Forest model."""
-    logger.info("Training Random Forest model")
+def confusion_matrix_bincount(y_true: np.ndarray, y_pred: np.ndarray) -> np.ndarray:
+    """Build the confusion matrix (rows true, columns predicted) with one bincount."""
+    y_true = np.asarray(y_true, dtype=np.intp)
+    y_pred = np.asarray(y_pred, dtype=np.intp)
+    if y_true.shape != y_pred.shape:
+        raise ValueError(f"y_true and y_pred have different shapes: {y_true.shape} vs {y_pred.shape}")
+    if y_true.size == 0:
+        raise ValueError("Cannot build a confusion matrix from empty labels")
+    if min(y_true.min(), y_pred.min()) < 0:
+        raise ValueError("Labels must be non-negative integers")
+    
+    n_classes = int(max(y_true.max(), y_pred.max())) + 1
+    
+    cm = np.bincount(y_true * n_classes + y_pred, minlength=n_classes * n_classes)
+    return cm.reshape(n_classes, n_classes)
+
+
+def report_from_confusion_matrix(cm: np.ndarray) -> Dict[str, Any]:
+    """Build a classification_report-style dict from a confusion matrix."""
+    tp = np.diag(cm).astype(np.float64)
+    predicted = cm.sum(axis=0)
+    support = cm.sum(axis=1)
+    total = int(support.sum())
+    
+    # Zero denominators score 0.0, matching sklearn's zero_division default
+    precision = np.divide(tp, predicted, out=np.zeros_like(tp), where=predicted > 0)
+    recall = np.divide(tp, support, out=np.zeros_like(tp), where=support > 0)
+    pr_sum = precision + recall
+    f1 = np.divide(2 * precision * recall, pr_sum, out=np.zeros_like(tp), where=pr_sum > 0)
+    
+    # Like sklearn, only report labels seen in either y_true or y_pred
+    present = (support > 0) | (predicted > 0)
+    weights = support / total
+    
+    report: Dict[str, Any] = {}
+    for c in np.flatnonzero(present):
+        report[str(c)] = {
+            "precision": float(precision[c]),
+            "recall": float(recall[c]),
+            "f1-score": float(f1[c]),
+            "support": int(support[c])
+        }
+    report["accuracy"] = float(tp.sum() / total)
+    report["macro avg"] = {
+        "precision": float(precision[present].mean()),
+        "recall": float(recall[present].mean()),
+        "f1-score": float(f1[present].mean()),
+        "support": total
+    }
+    report["weighted avg"] = {
+        "precision": float(np.dot(precision, weights)),
+        "recall": float(np.dot(recall, weights)),
+        "f1-score": float(np.dot(f1, weights)),
+        "support": total
+    }
+    return report
+
+
+def train_model(X_train: np.ndarray, y_train: np.ndarray) -> HistGradientBoostingClassifier:
+    """Train a histogram-based Gradient Boosting model."""
+    logger.info("Training Histogram Gradient Boosting model")
     
-    model = RandomForestClassifier(
-        n_estimators=100,
+    model = HistGradientBoostingClassifier(
+        max_iter=100,
         max_depth=10,
-        random_state=42,
-        n_jobs=-1
+        early_stopping=False,
+        random_state=42
     )
     
     model.fit(X_train, y_train)
@@ -70,50 +259,101 @@ def train_model(X_train: np.ndarray, y_train: np.ndarray) -> RandomForestClassif
     return model
 
 
-def evaluate_model(model: RandomForestClassifier, X_test: np.ndarray, y_test: np.ndarray) -> Dict[str, Any]:
-    """Evaluate the trained model."""
+def evaluate_model(model: HistGradientBoostingClassifier, X_test: np.ndarray, y_test: np.ndarray,
+                   full_report: bool = False) -> Dict[str, Any]:
+    """Evaluate the trained model.
+    
+    Records accuracy and the confusion matrix; the per-class report is only
+    built when ``full_report`` is set, since nothing downstream reads it.
+    """
     logger.info("Evaluating model performance")
     
     y_pred = model.predict(X_test)
-    accuracy = accuracy_score(y_test, y_pred)
+    cm = confusion_matrix_bincount(y_test, y_pred)
+    accuracy = float(np.trace(cm) / cm.sum())
     
     logger.info(f"Test accuracy: {accuracy:.4f}")
+    logger.info(f"Confusion matrix:\n{cm}")
     
     metrics = {
         "accuracy": accuracy,
-        "classification_report": classification_report(y_test, y_pred, output_dict=True),
+        "confusion_matrix": cm,
         "timestamp": datetime.now().isoformat()
     }
+    if full_report:
+        metrics["classification_report"] = report_from_confusion_matrix(cm)
     
     return metrics
 
 
-def save_model_and_artifacts(model: RandomForestClassifier, scaler: StandardScaler, 
-                           metrics: Dict[str, Any], model_name: str = "random_forest_model") -> str:
+def write_metrics(metrics: Dict[str, Any], metrics_path: str) -> None:
+    """Write the metrics dict to a JSON file."""
+    with open(metrics_path, 'wb') as f:
+        f.write(orjson.dumps(metrics, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+
+
+def save_scaler(scaler: StandardScaler, scaler_path: str) -> None:
+    """Write the fitted scaler's statistics to an uncompressed .npz file."""
+    np.savez(
+        scaler_path,
+        mean=scaler.mean_,
+        scale=scaler.scale_,
+        var=scaler.var_,
+        n=int(scaler.n_samples_seen_)
+    )
+
+
+def load_scaler(scaler_path: str) -> StandardScaler:
+    """Rebuild a fitted StandardScaler from a file written by save_scaler."""
+    scaler = StandardScaler()
+    with np.load(scaler_path) as state:
+        scaler.mean_ = state["mean"]
+        scaler.scale_ = state["scale"]
+        scaler.var_ = state["var"]
+        scaler.n_samples_seen_ = int(state["n"])
+    scaler.n_features_in_ = scaler.mean_.shape[0]
+    return scaler
+
+
+def save_model_and_artifacts(model: HistGradientBoostingClassifier, scaler: StandardScaler, 
+                           metrics: Dict[str, Any], model_name: str = "hist_gradient_boosting_model") -> str:
     """Save trained model and associated artifacts."""
     models_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "models")
     os.makedirs(models_dir, exist_ok=True)
     
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    model_path = os.path.join(models_dir, f"{model_name}_{timestamp}.pkl")
-    scaler_path = os.path.join(models_dir, f"{model_name}_scaler_{timestamp}.pkl")
+    model_path = os.path.join(models_dir, f"{model_name}_{timestamp}.skops")
+    scaler_path = os.path.join(models_dir, f"{model_name}_scaler_{timestamp}.npz")
     metrics_path = os.path.join(models_dir, f"{model_name}_metrics_{timestamp}.json")
     
     logger.info(f"Saving model to {model_path}")
-    with open(model_path, 'wb') as f:
-        pickle.dump(model, f)
-    
     logger.info(f"Saving scaler to {scaler_path}")
-    with open(scaler_path, 'wb') as f:
-        pickle.dump(scaler, f)
-    
     logger.info(f"Saving metrics to {metrics_path}")
-    with open(metrics_path, 'w') as f:
-        json.dump(metrics, f, indent=2)
+    
+    # Overlap serialization and disk writes; result() re-raises any failure
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        futures = [
+            executor.submit(sio.dump, model, model_path),
+            executor.submit(save_scaler, scaler, scaler_path),
+            executor.submit(write_metrics, metrics, metrics_path)
+        ]
+        for future in futures:
+            future.result()
     
     return model_path
 
 
+def load_artifact(path: str, trusted: Optional[List[str]] = None) -> Any:
+    """Load a model saved by save_model_and_artifacts.
+
+    TRUSTED_MODEL_TYPES are always trusted; pass any extra types (e.g. a
+    custom transformer added later) by fully qualified name in ``trusted``,
+    e.g. ``["mypackage.CustomTransformer"]``.
+    """
+    logger.info(f"Loading artifact from {path}")
+    return sio.load(path, trusted=TRUSTED_MODEL_TYPES + list(trusted or []))
+
+
 def main():
     """Main training pipeline."""
     logger.info("Starting ML training pipeline")
@@ -0,0 +1,188 @@
+"""Tests for the NumPy replacements in the training pipeline."""
+
+import json
+import os
+import stat
+
+import numpy as np
+import pytest
+import skops.io as sio
+from sklearn.datasets import make_classification
+from sklearn.metrics import classification_report
+from sklearn.preprocessing import StandardScaler
+
+import train
+from train import (
+    confusion_matrix_bincount,
+    create_synthetic_data,
+    evaluate_model,
+    load_artifact,
+    load_scaler,
+    report_from_confusion_matrix,
+    save_scaler,
+    scale_in_place,
+    stratified_split_indices,
+    train_model,
+    write_metrics,
+)
+
+
+@pytest.mark.parametrize("n_classes", [2, 3, 5])
+def test_report_matches_sklearn(n_classes):
+    rng = np.random.default_rng(n_classes)
+    y_true = rng.integers(0, n_classes, 500)
+    y_pred = rng.integers(0, n_classes, 500)
+    
+    report = report_from_confusion_matrix(confusion_matrix_bincount(y_true, y_pred))
+    expected = classification_report(y_true, y_pred, output_dict=True, zero_division=0)
+    
+    assert report.keys() == expected.keys()
+    assert report["accuracy"] == pytest.approx(expected["accuracy"])
+    for key, stats in expected.items():
+        if key == "accuracy":
+            continue
+        for name, value in stats.items():
+            assert report[key][name] == pytest.approx(value)
+
+
+def test_report_skips_absent_labels_and_zero_division():
+    y_true = np.array([0, 0, 2, 2])
+    y_pred = np.array([0, 0, 0, 0])
+    
+    report = report_from_confusion_matrix(confusion_matrix_bincount(y_true, y_pred))
+    expected = classification_report(y_true, y_pred, output_dict=True, zero_division=0)
+    
+    assert report.keys() == expected.keys()
+    assert report["2"]["precision"] == 0.0
+    assert report["macro avg"]["f1-score"] == pytest.approx(expected["macro avg"]["f1-score"])
+
+
+@pytest.mark.parametrize("y_true, y_pred", [
+    (np.array([], dtype=int), np.array([], dtype=int)),
+    (np.array([0, -1]), np.array([0, 1])),
+    (np.array([0, 1]), np.array([0, 1, 1])),
+])
+def test_confusion_matrix_rejects_invalid_labels(y_true, y_pred):
+    with pytest.raises(ValueError):
+        confusion_matrix_bincount(y_true, y_pred)
+
+
+@pytest.mark.parametrize("n_samples, n_classes", [(1000, 2), (997, 3), (250, 5)])
+def test_split_is_stratified_disjoint_cover(n_samples, n_classes):
+    y = np.random.default_rng(0).integers(0, n_classes, n_samples)
+    
+    train_idx, test_idx = stratified_split_indices(y, test_size=0.2, random_state=42)
+    
+    assert len(test_idx) == int(np.ceil(0.2 * n_samples))
+    assert len(np.intersect1d(train_idx, test_idx)) == 0
+    np.testing.assert_array_equal(np.sort(np.r_[train_idx, test_idx]), np.arange(n_samples))
+    
+    expected = 0.2 * np.bincount(y)
+    assert np.all(np.abs(np.bincount(y[test_idx], minlength=n_classes) - expected) < 1)
+
+
+def test_split_rejects_single_row_class():
+    y = np.array([0] * 10 + [1])
+    
+    with pytest.raises(ValueError):
+        stratified_split_indices(y)
+
+
+def test_split_interleaves_classes():
+    y = np.repeat([0, 1], 500)
+    
+    train_idx, test_idx = stratified_split_indices(y)
+    
+    # Class-sorted output would have exactly one class boundary
+    assert np.count_nonzero(np.diff(y[train_idx])) > 1
+    assert np.count_nonzero(np.diff(y[test_idx])) > 1
+
+
+def test_scaler_round_trip(tmp_path):
+    X = np.random.default_rng(0).normal(size=(200, 4))
+    scaler = StandardScaler().fit(X)
+    path = str(tmp_path / "scaler.npz")
+    
+    save_scaler(scaler, path)
+    loaded = load_scaler(path)
+    
+    X_copy = X.copy()
+    np.testing.assert_allclose(loaded.transform(X_copy), scaler.transform(X))
+    np.testing.assert_array_equal(X_copy, X)
+    assert loaded.n_samples_seen_ == 200
+    assert isinstance(loaded.n_samples_seen_, int)
+
+
+def test_load_artifact_reads_saved_model(tmp_path):
+    X, y = make_classification(n_samples=200, random_state=0)
+    model = train_model(X, y)
+    path = str(tmp_path / "model.skops")
+    sio.dump(model, path)
+    
+    loaded = load_artifact(path)
+    
+    np.testing.assert_array_equal(loaded.predict(X), model.predict(X))
+
+
+def test_synthetic_data_cache_miss_then_hit(tmp_path, monkeypatch):
+    X, y = create_synthetic_data(n_samples=100, n_features=20, data_dir=str(tmp_path))
+    
+    cached = list(tmp_path.glob("synth_*.npz"))
+    assert len(cached) == 1
+    umask = os.umask(0)
+    os.umask(umask)
+    assert stat.S_IMODE(os.stat(cached[0]).st_mode) == 0o666 & ~umask
+    
+    def fail(**kwargs):
+        raise AssertionError("cache hit should not regenerate the data")
+    monkeypatch.setattr(train, "make_classification", fail)
+    
+    X_cached, y_cached = create_synthetic_data(n_samples=100, n_features=20, data_dir=str(tmp_path))
+    np.testing.assert_array_equal(X_cached, X)
+    np.testing.assert_array_equal(y_cached, y)
+    
+    # A different shape is a cache miss
+    with pytest.raises(AssertionError):
+        create_synthetic_data(n_samples=50, n_features=20, data_dir=str(tmp_path))
+
+
+@pytest.mark.parametrize("n_rows", [1000, train.PARALLEL_MIN_ROWS])
+def test_scale_in_place_matches_scaler(n_rows):
+    X = np.random.default_rng(0).normal(loc=3.0, scale=2.0, size=(n_rows, 4))
+    scaler = StandardScaler().fit(X)
+    expected = scaler.transform(X)
+    
+    scaled = scale_in_place(scaler, X)
+    
+    assert scaled is X
+    np.testing.assert_allclose(scaled, expected, rtol=1e-6, atol=1e-9)
+
+
+def test_scale_in_place_upcasts_integer_input():
+    X = np.random.default_rng(0).integers(0, 10, size=(100, 3))
+    scaler = StandardScaler().fit(X)
+    
+    scaled = scale_in_place(scaler, X)
+    
+    assert scaled.dtype == np.float64
+    np.testing.assert_allclose(scaled, scaler.transform(X))
+
+
+@pytest.mark.parametrize("full_report", [False, True])
+def test_evaluate_model_metrics_written_as_json(tmp_path, full_report):
+    X, y = make_classification(n_samples=200, random_state=0)
+    model = train_model(X, y)
+    
+    metrics = evaluate_model(model, X, y, full_report=full_report)
+    path = str(tmp_path / "metrics.json")
+    write_metrics(metrics, path)
+    
+    with open(path) as f:
+        written = json.load(f)
+    
+    assert isinstance(metrics["confusion_matrix"], np.ndarray)
+    assert written["confusion_matrix"] == metrics["confusion_matrix"].tolist()
+    assert written["accuracy"] == pytest.approx(metrics["accuracy"])
+    assert ("classification_report" in written) == full_report
+    if full_report:
+        assert written["classification_report"]["accuracy"] == pytest.approx(metrics["accuracy"])